@@ -12,7 +12,10 @@ Log format (valid line):
   timestamp | level | service | message
 
 Valid rules:
+  - lines end in LF or CRLF (a bare CR does not end a line)
   - exactly 4 fields after splitting by '|'
+  - whitespace around each field is trimmed; only ASCII whitespace counts
+    (space, \t, \r, \v, \f), so e.g. a non-breaking space is part of the field
   - level (after uppercasing) is one of: INFO, WARN, ERROR
 
 Examples:
@@ -22,13 +25,42 @@ Examples:
 """
 
 import argparse
+import functools
+import io
+import mmap
+import os
+import re
+import stat
+import sys
 from pathlib import Path
 
 LOG_FILE = Path("logs.txt")
 DEFAULT_OUT = "filtered_logs.txt"
+# Read size for logs that cannot be memory-mapped (pipes, FIFOs)
+CHUNK_SIZE = 1 << 20
+# Logs this large pay for the Numba scanner even on a cold cache, when the
+# first run compiles it (several seconds); smaller logs use the regex scanner
+JIT_MIN_BYTES = 1 << 30
 ALLOWED_LEVELS = {"INFO", "WARN", "ERROR"}
+# Usual spellings (INFO/info/Info, ...) mapped straight to the canonical level,
+# so the common case is one dict hit; rarer mixed case falls back to bytes.upper(),
+# which is already ASCII-only.
+LEVEL_LOOKUP = {
+    spelling: level for level in ALLOWED_LEVELS for spelling in (level, level.lower(), level.capitalize())
+}
+LEVEL_LOOKUP_B = {spelling.encode(): level.encode() for spelling, level in LEVEL_LOOKUP.items()}
 
+# One valid line: exactly 4 '|'-separated fields on a single line and an allowed
+# level (any case). Whitespace around the level is consumed here; the other
+# fields are stripped by the caller once they are needed.
+_WS = rb"[ \t\r\f\v]*"
+VALID_LINE_RE = re.compile(
+    rb"^([^|\n]*)\|" + _WS + rb"(INFO|WARN|ERROR)" + _WS + rb"\|([^|\n]*)\|([^|\n]*)$",
+    re.MULTILINE | re.IGNORECASE,
+)
 
+
+@functools.lru_cache(maxsize=8192)
 def parse_line(line: str):
     """
     Parse a log line.
@@ -38,33 +70,196 @@ def parse_line(line: str):
     - Empty lines are invalid.
     - Split by '|', trim whitespace around each part.
     - Must have exactly 4 parts.
+
+    main() inlines an equivalent bytes version of this; it is kept for callers
+    that import the module. Results are cached, so repeated lines (heartbeats,
+    status pings) are only parsed once.
     """
-    if not line:
-        return None
-    raw = line.strip()
-    if not raw:
+    # One count() rejects anything without exactly three separators before
+    # any splitting happens
+    if line.count("|") != 3:
         return None
-    parts = [p.strip() for p in raw.split("|")]
-    if len(parts) != 4:
-        return None
-    timestamp, level, service, message = parts
+    timestamp, level, service, message = [p.strip() for p in line.split("|")]
     return timestamp, level, service, message
 
 
 def is_valid_level(level: str) -> bool:
     """Return True if level is one of INFO/WARN/ERROR."""
-    return level.strip().upper() in ALLOWED_LEVELS
+    return level in LEVEL_LOOKUP or level.strip().upper() in ALLOWED_LEVELS
 
 
 def matches_filters(level: str, service: str, level_filter, service_filter) -> bool:
-    """Return True if the line matches the provided filters."""
-    if level_filter is not None and level.upper() != level_filter:
+    """Return True if the line matches the provided filters (level must already be uppercased)."""
+    if level_filter is not None and level != level_filter:
         return False
     if service_filter is not None and service != service_filter:
         return False
     return True
 
 
+def _loop_all(buf, write):
+    """py_filter_mmap with no filters."""
+    lookup = LEVEL_LOOKUP_B.get
+    lines_written = 0
+    for m in VALID_LINE_RE.finditer(buf):
+        timestamp, level, service, message = m.groups()
+        write(b"%s | %s | %s | %s\n" % (
+            timestamp.strip(), lookup(level) or level.upper(), service.strip(), message.strip()
+        ))
+        lines_written += 1
+    return lines_written, lines_written
+
+
+def _loop_lvl(buf, lvl_b, write):
+    """py_filter_mmap with only the level filter."""
+    lookup = LEVEL_LOOKUP_B.get
+    total_valid_scanned = 0
+    lines_written = 0
+    for m in VALID_LINE_RE.finditer(buf):
+        timestamp, level, service, message = m.groups()
+        total_valid_scanned += 1
+        if (lookup(level) or level.upper()) != lvl_b:
+            continue
+        write(b"%s | %s | %s | %s\n" % (timestamp.strip(), lvl_b, service.strip(), message.strip()))
+        lines_written += 1
+    return total_valid_scanned, lines_written
+
+
+def _loop_svc(buf, svc_b, write):
+    """py_filter_mmap with only the service filter."""
+    lookup = LEVEL_LOOKUP_B.get
+    total_valid_scanned = 0
+    lines_written = 0
+    for m in VALID_LINE_RE.finditer(buf):
+        timestamp, level, service, message = m.groups()
+        total_valid_scanned += 1
+        if service.strip() != svc_b:
+            continue
+        write(b"%s | %s | %s | %s\n" % (
+            timestamp.strip(), lookup(level) or level.upper(), svc_b, message.strip()
+        ))
+        lines_written += 1
+    return total_valid_scanned, lines_written
+
+
+def _loop_both(buf, lvl_b, svc_b, write):
+    """py_filter_mmap with both filters."""
+    lookup = LEVEL_LOOKUP_B.get
+    total_valid_scanned = 0
+    lines_written = 0
+    for m in VALID_LINE_RE.finditer(buf):
+        timestamp, level, service, message = m.groups()
+        total_valid_scanned += 1
+        if (lookup(level) or level.upper()) != lvl_b or service.strip() != svc_b:
+            continue
+        write(b"%s | %s | %s | %s\n" % (timestamp.strip(), lvl_b, svc_b, message.strip()))
+        lines_written += 1
+    return total_valid_scanned, lines_written
+
+
+def py_filter_mmap(buf, lvl_b, svc_b, write):
+    """
+    Scan a bytes-like log buffer and pass each matching line to write().
+    Returns (valid lines scanned, lines written).
+
+    lvl_b/svc_b are the encoded filters, or None to skip that filter. Each
+    combination has its own loop, so the per-line body only carries the checks
+    that apply. Fields other than the level are strip()ed after the match.
+    filter_mmap is this function unless the C version from log_tool_core
+    has been built.
+    """
+    if lvl_b is None and svc_b is None:
+        return _loop_all(buf, write)
+    if svc_b is None:
+        return _loop_lvl(buf, lvl_b, write)
+    if lvl_b is None:
+        return _loop_svc(buf, svc_b, write)
+    return _loop_both(buf, lvl_b, svc_b, write)
+
+
+try:
+    from log_tool_core import filter_mmap
+    HAVE_C_SCANNER = True
+except ImportError:
+    # Extension not built (see log_tool_core.pyx); use the pure-Python scanner
+    filter_mmap = py_filter_mmap
+    HAVE_C_SCANNER = False
+
+
+def pick_scanner(size: int):
+    """
+    Return the filter_mmap implementation to use for a log of `size` bytes.
+
+    Without the C extension, logs of at least JIT_MIN_BYTES go to the
+    parallel Numba scanner in log_tool_jit when numba/numpy are installed.
+    It is imported lazily so small runs never pay for loading Numba.
+    """
+    if not HAVE_C_SCANNER and size >= JIT_MIN_BYTES:
+        try:
+            from log_tool_jit import filter_mmap as jit_filter_mmap
+        except ImportError:
+            pass
+        else:
+            return jit_filter_mmap
+    return filter_mmap
+
+
+def scan_stream(fin, lvl_b, svc_b, write, chunk_size: int = CHUNK_SIZE):
+    """
+    Scan a log that cannot be memory-mapped by reading it in large chunks.
+    Each chunk is cut at its last newline and its complete lines are handed
+    to filter_mmap; the pieces of an unfinished line are kept and joined only
+    once its newline arrives, so a long line is copied once, not per read.
+    Returns (valid lines scanned, lines written).
+    """
+    total_valid_scanned = 0
+    lines_written = 0
+    pending = []
+    while chunk := fin.read(chunk_size):
+        cut = chunk.rfind(b"\n") + 1
+        if not cut:
+            pending.append(chunk)
+            continue
+        if pending:
+            pending.append(memoryview(chunk)[:cut])
+            lines = b"".join(pending)
+            pending.clear()
+        else:
+            lines = memoryview(chunk)[:cut]
+        valid, written = filter_mmap(lines, lvl_b, svc_b, write)
+        total_valid_scanned += valid
+        lines_written += written
+        if cut < len(chunk):
+            pending.append(chunk[cut:])
+    if pending:
+        valid, written = filter_mmap(b"".join(pending), lvl_b, svc_b, write)
+        total_valid_scanned += valid
+        lines_written += written
+    return total_valid_scanned, lines_written
+
+
+def scan_log(fin, lvl_b, svc_b, write):
+    """
+    Scan the open log file fin, mapping it when it is a regular file and
+    streaming it otherwise. Returns (valid lines scanned, lines written).
+    """
+    st = os.fstat(fin.fileno())
+    if not stat.S_ISREG(st.st_mode):
+        # Pipes and FIFOs cannot be mapped (and report size 0), so read them in chunks
+        return scan_stream(fin, lvl_b, svc_b, write)
+    if not st.st_size:
+        # mmap refuses zero-length files
+        return 0, 0
+    with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        scan = pick_scanner(len(mm))
+        if scan is filter_mmap and hasattr(mmap, "MADV_SEQUENTIAL"):
+            # filter_mmap (Python or C) is one front-to-back pass: let the
+            # kernel read ahead aggressively and drop pages behind it. The
+            # Numba scanner re-reads each window in several passes, so no hint.
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        return scan(mm, lvl_b, svc_b, write)
+
+
 def build_arg_parser() -> argparse.ArgumentParser:
     """Create and return the argparse parser."""
     parser = argparse.ArgumentParser(description="Filter cloud logs by level and/or service.")
@@ -90,45 +285,50 @@ def build_arg_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def print_summary(total_valid_scanned: int, lines_written: int, out_path: Path) -> None:
+    """Print the 3-line summary with a single write."""
+    sys.stdout.write(
+        f"Valid lines scanned: {total_valid_scanned}\n"
+        f"Lines written: {lines_written}\n"
+        f"Output file: {out_path}\n"
+    )
+
+
 def main():
     parser = build_arg_parser()
     args = parser.parse_args()
 
-    level_filter = args.level.upper() if getattr(args, "level", None) else None
-    service_filter = args.service if getattr(args, "service", None) else None
+    level_filter = args.level.upper() if args.level else None
+    service_filter = args.service if args.service else None
     out_path = Path(args.out)
 
     if not LOG_FILE.exists():
         # Keep to the 3-line summary shape even if missing file
-        print("Valid lines scanned: 0")
-        print("Lines written: 0")
-        print(f"Output file: {out_path}")
+        print_summary(0, 0, out_path)
         return
 
-    total_valid_scanned = 0
-    lines_written = 0
-    output_lines = []
-
-    with LOG_FILE.open("r", encoding="utf-8", errors="replace") as fin:
-        for line in fin:
-            parsed = parse_line(line)
-            if parsed is None:
-                continue
-            timestamp, level, service, message = parsed
-            level_up = level.upper()
-            if level_up not in ALLOWED_LEVELS:
-                continue
-            total_valid_scanned += 1
-            if matches_filters(level_up, service, level_filter, service_filter):
-                output_lines.append(f"{timestamp} | {level_up} | {service} | {message}")
-                lines_written += 1
+    # Filters are compared against raw bytes, so encode them once up front.
+    # Levels are ASCII; a non-ASCII --level becomes '?' and simply matches nothing.
+    lvl_b = level_filter.encode("ascii", errors="replace") if level_filter else None
+    svc_b = service_filter.encode("utf-8") if service_filter else None
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text("\n".join(output_lines) + ("\n" if output_lines else ""), encoding="utf-8")
+    held = None
+    with open(LOG_FILE, "rb") as fin:
+        if out_path.exists() and os.path.samefile(out_path, LOG_FILE):
+            # Opening --out for writing would truncate the log before it is read,
+            # so hold the output in memory and write it once the scan is done
+            held = io.BytesIO()
+            total_valid_scanned, lines_written = scan_log(fin, lvl_b, svc_b, held.write)
+        else:
+            # Matches are streamed straight out, so memory stays flat however many lines match.
+            # The 1 MiB buffer batches them into few write() syscalls without per-line Python bookkeeping.
+            with open(out_path, "wb", buffering=1 << 20) as out_fh:
+                total_valid_scanned, lines_written = scan_log(fin, lvl_b, svc_b, out_fh.write)
+    if held is not None:
+        out_path.write_bytes(held.getbuffer())
 
-    print(f"Valid lines scanned: {total_valid_scanned}")
-    print(f"Lines written: {lines_written}")
-    print(f"Output file: {out_path}")
+    print_summary(total_valid_scanned, lines_written, out_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+C build of log_tool.filter_mmap.
+
+Same rules and output as the pure-Python scanner, but the byte scan is a
+plain C loop over the buffer (memchr for '|' and newline, memcmp for the
+service filter). Build it next to log_tool.py with:
+
+  cythonize -i log_tool_core.pyx
+
+log_tool.py picks it up automatically and falls back to Python without it.
+"""
+
+from libc.string cimport memchr, memcmp
+
+# Indexed by the code _level_code() returns
+LEVELS = (None, b"INFO", b"WARN", b"ERROR")
+
+
+cdef inline bint _is_space(unsigned char c) noexcept nogil:
+    # Same bytes bytes.strip() removes (newlines never reach here)
+    return c == 32 or 9 <= c <= 13
+
+
+cdef inline bint _ieq(const unsigned char* p, const char* word, Py_ssize_t n) noexcept nogil:
+    """ASCII case-insensitive compare of p[:n] against an uppercase word."""
+    cdef Py_ssize_t i
+    cdef unsigned char c
+    for i in range(n):
+        c = p[i]
+        if 97 <= c <= 122:
+            c -= 32
+        if c != <unsigned char>word[i]:
+            return False
+    return True
+
+
+cdef inline int _level_code(const unsigned char* p, Py_ssize_t n) noexcept nogil:
+    """Return 1/2/3 for INFO/WARN/ERROR in any case, 0 for anything else."""
+    if n == 4:
+        if _ieq(p, b"INFO", 4):
+            return 1
+        if _ieq(p, b"WARN", 4):
+            return 2
+    elif n == 5 and _ieq(p, b"ERROR", 5):
+        return 3
+    return 0
+
+
+cdef inline bint _is_upper(const unsigned char* p, Py_ssize_t n) noexcept nogil:
+    cdef Py_ssize_t i
+    for i in range(n):
+        if p[i] >= 97:
+            return False
+    return True
+
+
+cdef inline bint _is_sep(const unsigned char* base, Py_ssize_t end, Py_ssize_t next_start) noexcept nogil:
+    """True if exactly " | " sits between a trimmed field ending at end and the next one."""
+    return next_start == end + 3 and base[end] == 32 and base[end + 1] == 0x7C and base[end + 2] == 32
+
+
+def filter_mmap(const unsigned char[::1] buf, bytes lvl, bytes svc, object write):
+    """
+    Scan a bytes-like log buffer and pass each matching line to write().
+    Returns (valid lines scanned, lines written).
+    """
+    cdef Py_ssize_t n = buf.shape[0]
+    cdef Py_ssize_t valid = 0, written = 0
+    cdef Py_ssize_t s = 0, e, line_start
+    cdef Py_ssize_t ta, tb, la, lb, sa, sb, ma, mb
+    cdef const unsigned char* base
+    cdef const unsigned char* hit
+    cdef const unsigned char* p1
+    cdef const unsigned char* p2
+    cdef const unsigned char* p3
+    cdef int code
+    cdef int lvl_code = -1
+    cdef const char* svc_p = NULL
+    cdef Py_ssize_t svc_n = -1
+    # Consecutive matches that are already in output form are written as one
+    # slice of the original buffer, buf[run_start:run_end], without copying
+    cdef Py_ssize_t run_start = -1, run_end = -1
+
+    if n == 0:
+        return 0, 0
+    base = &buf[0]
+    if lvl is not None:
+        # An unknown filter level maps to 0 and so never matches a valid line
+        lvl_code = _level_code(<const unsigned char*>lvl, len(lvl))
+    if svc is not None:
+        svc_p = svc
+        svc_n = len(svc)
+
+    while s < n:
+        line_start = s
+        hit = <const unsigned char*>memchr(base + s, 0x0A, n - s)
+        e = hit - base if hit != NULL else n
+        s = e + 1
+        # Shorter than "|INFO||" cannot be valid
+        if e - line_start < 7:
+            continue
+
+        # Exactly three '|' on the line
+        p1 = <const unsigned char*>memchr(base + line_start, 0x7C, e - line_start)
+        if p1 == NULL:
+            continue
+        p2 = <const unsigned char*>memchr(p1 + 1, 0x7C, base + e - (p1 + 1))
+        if p2 == NULL:
+            continue
+        p3 = <const unsigned char*>memchr(p2 + 1, 0x7C, base + e - (p2 + 1))
+        if p3 == NULL or memchr(p3 + 1, 0x7C, base + e - (p3 + 1)) != NULL:
+            continue
+
+        la = p1 - base + 1
+        lb = p2 - base
+        while la < lb and _is_space(base[la]):
+            la += 1
+        while lb > la and _is_space(base[lb - 1]):
+            lb -= 1
+        code = _level_code(base + la, lb - la)
+        if code == 0:
+            continue
+        valid += 1
+        if lvl_code != -1 and code != lvl_code:
+            continue
+
+        sa = p2 - base + 1
+        sb = p3 - base
+        while sa < sb and _is_space(base[sa]):
+            sa += 1
+        while sb > sa and _is_space(base[sb - 1]):
+            sb -= 1
+        if svc_n != -1 and (sb - sa != svc_n or memcmp(base + sa, svc_p, svc_n) != 0):
+            continue
+
+        ta = line_start
+        tb = p1 - base
+        while ta < tb and _is_space(base[ta]):
+            ta += 1
+        while tb > ta and _is_space(base[tb - 1]):
+            tb -= 1
+        ma = p3 - base + 1
+        mb = e
+        while ma < mb and _is_space(base[ma]):
+            ma += 1
+        while mb > ma and _is_space(base[mb - 1]):
+            mb -= 1
+
+        written += 1
+        if (ta == line_start and mb == e and _is_upper(base + la, lb - la)
+                and _is_sep(base, tb, la) and _is_sep(base, lb, sa) and _is_sep(base, sb, ma)):
+            # Already in output form: extend the run of verbatim lines
+            if line_start != run_end:
+                if run_start != -1:
+                    write(buf[run_start:run_end])
+                run_start = line_start
+            run_end = s if s <= n else n
+            continue
+
+        if run_start != -1:
+            write(buf[run_start:run_end])
+            run_start = run_end = -1
+        write(b"%s | %s | %s | %s\n" % (
+            (<const char*>base)[ta:tb], LEVELS[code], (<const char*>base)[sa:sb], (<const char*>base)[ma:mb]
+        ))
+
+    if run_start != -1:
+        write(buf[run_start:run_end])
+        if base[n - 1] != 0x0A and run_end == n:
+            # The log's last line had no newline; output lines always end in one
+            write(b"\n")
+    return valid, written
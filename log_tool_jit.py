@@ -0,0 +1,266 @@
+"""
+Numba build of log_tool.filter_mmap for very large logs.
+
+Log lines are independent, so the log is walked in newline-aligned windows
+of at most WINDOW_BYTES and WINDOW_LINES lines, and each window is cut into
+one chunk per thread that is scanned in parallel with prange. Each line's
+trimmed field bounds land in a preallocated array (57 bytes per line, blank
+or invalid lines included), and the matches are rendered in parallel into one
+output buffer per window, written before the next window starts. Memory
+therefore stays bounded by the window, not the log.
+
+Needs numba and numpy. log_tool only imports this module for logs of at least
+JIT_MIN_BYTES, large enough to cover the import and, on a cold cache, the
+first compile.
+"""
+
+import numpy as np
+from numba import get_num_threads, njit, prange
+
+NL = 0x0A
+PIPE = 0x7C
+# Bytes handed to one _scan call; bounds its output buffer
+WINDOW_BYTES = 64 << 20
+# Lines handed to one _scan call; bounds its per-line rows (about 57 MiB)
+WINDOW_LINES = 1 << 20
+
+
+@njit(cache=True)
+def _is_space(c):
+    # Same bytes bytes.strip() removes
+    return c == 32 or 9 <= c <= 13
+
+
+@njit(cache=True)
+def _ieq(buf, a, word):
+    """ASCII case-insensitive compare of buf[a:a + len(word)] against an uppercase word."""
+    for i in range(word.size):
+        c = buf[a + i]
+        if 97 <= c <= 122:
+            c -= 32
+        if c != word[i]:
+            return False
+    return True
+
+
+@njit(cache=True)
+def _level_code(buf, a, b, info, warn, error):
+    """Return 1/2/3 for INFO/WARN/ERROR in any case, 0 for anything else."""
+    n = b - a
+    if n == 4:
+        if _ieq(buf, a, info):
+            return 1
+        if _ieq(buf, a, warn):
+            return 2
+    elif n == 5 and _ieq(buf, a, error):
+        return 3
+    return 0
+
+
+@njit(cache=True)
+def _chunk_bounds(buf, nchunks):
+    """Split buf into nchunks ranges that each start at the beginning of a line."""
+    n = buf.size
+    bounds = np.empty(nchunks + 1, np.int64)
+    bounds[0] = 0
+    for i in range(1, nchunks):
+        b = max(n * i // nchunks, bounds[i - 1])
+        while 0 < b < n and buf[b - 1] != NL:
+            b += 1
+        bounds[i] = b
+    bounds[nchunks] = n
+    return bounds
+
+
+@njit(cache=True)
+def _window_end(buf, start, max_bytes, max_lines):
+    """
+    End of the window starting at start: just after its last newline within
+    max_bytes, or after its max_lines-th newline if that comes first. A line
+    longer than max_bytes stretches the window to that line's own newline.
+    """
+    n = buf.size
+    limit = min(start + max_bytes, n)
+    last = -1
+    lines = 0
+    i = start
+    while i < n:
+        if buf[i] == NL:
+            last = i
+            lines += 1
+            if lines == max_lines:
+                break
+        i += 1
+        if i >= limit and last != -1:
+            break
+    return n if last == -1 else last + 1
+
+
+@njit(cache=True)
+def _parse_line(buf, s, e, row, info, warn, error):
+    """
+    Fill row with the trimmed field bounds of buf[s:e]
+    (ts_start, ts_end, level_code, svc_start, svc_end, msg_start, msg_end).
+    Leaves level_code at 0 when the line is invalid.
+    """
+    p1 = p2 = p3 = -1
+    for i in range(s, e):
+        if buf[i] == PIPE:
+            if p1 == -1:
+                p1 = i
+            elif p2 == -1:
+                p2 = i
+            elif p3 == -1:
+                p3 = i
+            else:
+                return
+    if p3 == -1:
+        return
+
+    la, lb = p1 + 1, p2
+    while la < lb and _is_space(buf[la]):
+        la += 1
+    while lb > la and _is_space(buf[lb - 1]):
+        lb -= 1
+    code = _level_code(buf, la, lb, info, warn, error)
+    if code == 0:
+        return
+
+    bounds = ((s, p1), (p2 + 1, p3), (p3 + 1, e))
+    slots = (0, 3, 5)
+    for k in range(3):
+        a, b = bounds[k]
+        while a < b and _is_space(buf[a]):
+            a += 1
+        while b > a and _is_space(buf[b - 1]):
+            b -= 1
+        row[slots[k]] = a
+        row[slots[k] + 1] = b
+    row[2] = code
+
+
+@njit(cache=True)
+def _copy(out, o, buf, a, b):
+    for i in range(b - a):
+        out[o + i] = buf[a + i]
+    return o + b - a
+
+
+@njit(parallel=True, cache=True)
+def _scan(buf, nchunks, lvl_code, svc, use_svc, info, warn, error):
+    """Return (output bytes, valid lines, matched lines) for the log in buf."""
+    bounds = _chunk_bounds(buf, nchunks)
+
+    # Pass 1: lines per chunk, so each chunk knows where its rows start
+    counts = np.zeros(nchunks, np.int64)
+    for c in prange(nchunks):
+        s, e = bounds[c], bounds[c + 1]
+        k = 0
+        for i in range(s, e):
+            if buf[i] == NL:
+                k += 1
+        if e > s and buf[e - 1] != NL:
+            k += 1
+        counts[c] = k
+    offsets = np.zeros(nchunks + 1, np.int64)
+    offsets[1:] = np.cumsum(counts)
+
+    # Pass 2: parse and filter every line, tallying each chunk's output size
+    rows = np.zeros((offsets[nchunks], 7), np.int64)
+    matched = np.zeros(offsets[nchunks], np.bool_)
+    out_sizes = np.zeros(nchunks, np.int64)
+    for c in prange(nchunks):
+        r = offsets[c]
+        s, end = bounds[c], bounds[c + 1]
+        size = 0
+        while s < end:
+            e = s
+            while e < end and buf[e] != NL:
+                e += 1
+            row = rows[r]
+            _parse_line(buf, s, e, row, info, warn, error)
+            if row[2] != 0 and (lvl_code == -1 or row[2] == lvl_code):
+                hit = True
+                if use_svc:
+                    hit = row[4] - row[3] == svc.size
+                    i = 0
+                    while hit and i < svc.size:
+                        hit = buf[row[3] + i] == svc[i]
+                        i += 1
+                if hit:
+                    matched[r] = True
+                    # "ts | LEVEL | svc | msg\n"
+                    size += (row[1] - row[0]) + (4 if row[2] != 3 else 5) + (row[4] - row[3]) + (row[6] - row[5]) + 10
+            r += 1
+            s = e + 1
+        out_sizes[c] = size
+    out_offsets = np.zeros(nchunks + 1, np.int64)
+    out_offsets[1:] = np.cumsum(out_sizes)
+
+    # Pass 3: each chunk renders its matches into its slice of the output
+    out = np.empty(out_offsets[nchunks], np.uint8)
+    sep = np.array([32, PIPE, 32], np.uint8)
+    for c in prange(nchunks):
+        o = out_offsets[c]
+        for r in range(offsets[c], offsets[c + 1]):
+            if not matched[r]:
+                continue
+            row = rows[r]
+            o = _copy(out, o, buf, row[0], row[1])
+            o = _copy(out, o, sep, 0, 3)
+            level = info if row[2] == 1 else warn if row[2] == 2 else error
+            o = _copy(out, o, level, 0, level.size)
+            o = _copy(out, o, sep, 0, 3)
+            o = _copy(out, o, buf, row[3], row[4])
+            o = _copy(out, o, sep, 0, 3)
+            o = _copy(out, o, buf, row[5], row[6])
+            out[o] = NL
+            o += 1
+
+    valid = 0
+    for r in range(rows.shape[0]):
+        if rows[r, 2] != 0:
+            valid += 1
+    return out, valid, np.count_nonzero(matched)
+
+
+def _word(b):
+    return np.frombuffer(b, dtype=np.uint8)
+
+
+def filter_mmap(buf, lvl_b, svc_b, write, window: int = WINDOW_BYTES, window_lines: int = WINDOW_LINES):
+    """
+    Scan a log buffer (bytes or mmap) and pass the matching lines to write().
+    Returns (valid lines scanned, lines written).
+
+    The buffer is processed in newline-aligned windows of about `window`
+    bytes and at most `window_lines` lines, each scanned in parallel and
+    written before the next starts.
+    """
+    words = _word(b"INFO"), _word(b"WARN"), _word(b"ERROR")
+    lvl_code = -1
+    if lvl_b is not None:
+        lvl = _word(lvl_b)
+        # An unknown filter level maps to 0 and so never matches a valid line
+        lvl_code = _level_code(lvl, 0, lvl.size, *words)
+    svc = _word(svc_b if svc_b is not None else b"")
+    nchunks = get_num_threads()
+
+    total_valid_scanned = 0
+    lines_written = 0
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    try:
+        start = 0
+        while start < arr.size:
+            end = _window_end(arr, start, window, window_lines)
+            out, valid, written = _scan(arr[start:end], nchunks, lvl_code, svc, svc_b is not None, *words)
+            # Each window's matches are already rendered, so they go out in one write
+            if out.size:
+                write(out)
+            total_valid_scanned += int(valid)
+            lines_written += int(written)
+            start = end
+    finally:
+        # Drop the export so the caller can close the mmap
+        del arr
+    return total_valid_scanned, lines_written
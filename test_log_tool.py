@@ -0,0 +1,199 @@
+"""
+Differential tests: every available filter_mmap implementation must agree
+with the line-by-line parse_line semantics of the original tool, and main()
+must behave like it end to end.
+
+  python -m unittest test_log_tool
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import log_tool
+
+CASES = {
+    "empty": b"",
+    "sample": (
+        b"2026-02-05 08:11:02 | INFO | auth | User login success\n"
+        b"2026-02-05 08:11:25 | warn | api | Slow response detected (920ms)\n"
+        b"BAD LINE WITHOUT SEPARATORS\n"
+        b"2026-02-05 08:11:50 | DEBUG | api | Debug mode message\n"
+    ),
+    "no_final_newline": b"a | INFO | auth | x\nb | WARN | api | y",
+    "crlf": b"a | info | auth | x\r\nb | WARN | api | y\r\n\r\n",
+    "empty_fields": b"|INFO||\n | error |  | \n|||\n||||\na | INFO | | x\n",
+    "whitespace": b"  a  |\tInFo\t| auth  |  hello world  \n\x0bb\x0c|WARN|api|m\n",
+    "too_many_fields": b"a | INFO | auth | x | y\na|INFO|auth\n",
+    "canonical_runs": (
+        b"a | INFO | auth | x\nb | WARN | api | y\nbad\nc | ERROR | auth | z\n"
+        b"d | info | auth | w\ne | INFO | auth | v\nf | INFO |  | v\ng | ERROR | db | q"
+    ),
+    "utf8": "t | info | sérvice | mess ✓ \n".encode(),
+    "blank_lines": b"\n\n   \n",
+}
+
+FILTERS = [
+    (None, None),
+    (b"ERROR", None),
+    (b"WARN", None),
+    (None, b"auth"),
+    (b"INFO", b"auth"),
+    (b"VERB", None),
+]
+
+
+def reference(data, lvl_b, svc_b):
+    """Filter data the way the original text-mode tool did, line by line."""
+    level_filter = lvl_b.decode() if lvl_b is not None else None
+    service_filter = svc_b.decode() if svc_b is not None else None
+    total_valid_scanned = 0
+    out = []
+    for raw in data.split(b"\n"):
+        parsed = log_tool.parse_line(raw.decode("utf-8"))
+        if parsed is None:
+            continue
+        timestamp, level, service, message = parsed
+        level_up = level.upper()
+        if level_up not in log_tool.ALLOWED_LEVELS:
+            continue
+        total_valid_scanned += 1
+        if log_tool.matches_filters(level_up, service, level_filter, service_filter):
+            out.append(f"{timestamp} | {level_up} | {service} | {message}\n")
+    return total_valid_scanned, len(out), "".join(out).encode("utf-8")
+
+
+def random_log(rng):
+    # ASCII whitespace only: the byte scanners do not trim Unicode spaces
+    pieces = ["a", "auth", "api", "INFO", "info", "Warn", "ERROR", "debug", " ", "  ", "\t", "|", " | ", "\r", "x"]
+    lines = ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 12))) for _ in range(rng.randint(0, 30))]
+    data = "\n".join(lines)
+    if rng.random() < 0.5:
+        data += "\n"
+    return data.encode()
+
+
+def scanners():
+    """(name, filter_mmap) for every implementation importable here."""
+    found = [("python", log_tool.py_filter_mmap)]
+    try:
+        import log_tool_core
+    except ImportError:
+        pass
+    else:
+        found.append(("cython", log_tool_core.filter_mmap))
+    try:
+        import log_tool_jit
+    except ImportError:
+        pass
+    else:
+        found.append(("numba", log_tool_jit.filter_mmap))
+        # Tiny windows exercise the newline-aligned window cuts
+        found.append(("numba-window", lambda buf, lvl_b, svc_b, write: log_tool_jit.filter_mmap(
+            buf, lvl_b, svc_b, write, window=7
+        )))
+        found.append(("numba-window-lines", lambda buf, lvl_b, svc_b, write: log_tool_jit.filter_mmap(
+            buf, lvl_b, svc_b, write, window_lines=2
+        )))
+    return found
+
+
+def run(scan, data, lvl_b, svc_b):
+    chunks = []
+    valid, written = scan(data, lvl_b, svc_b, lambda b: chunks.append(bytes(b)))
+    return valid, written, b"".join(chunks)
+
+
+class ScannerAgreementTest(unittest.TestCase):
+    def check(self, data):
+        for lvl_b, svc_b in FILTERS:
+            expected = reference(data, lvl_b, svc_b)
+            for name, scan in scanners():
+                with self.subTest(scanner=name, data=data, level=lvl_b, service=svc_b):
+                    self.assertEqual(run(scan, data, lvl_b, svc_b), expected)
+
+    def test_edge_cases(self):
+        for data in CASES.values():
+            self.check(data)
+
+    def test_random_logs(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            self.check(random_log(rng))
+
+
+class ScanStreamTest(unittest.TestCase):
+    def test_matches_whole_buffer_scan(self):
+        long_line = b"t | INFO | auth | " + b"m" * 5000 + b"\n"
+        for data in [*CASES.values(), long_line * 3, b"x" * 3000 + b"\n" + long_line]:
+            for chunk_size in (1, 7, 64, 4096):
+                with self.subTest(data=data[:40], chunk_size=chunk_size):
+                    chunks = []
+                    result = log_tool.scan_stream(io.BytesIO(data), None, None, chunks.append, chunk_size)
+                    self.assertEqual((*result, b"".join(bytes(c) for c in chunks)), reference(data, None, None))
+
+
+class MainTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.log = self.dir / "logs.txt"
+        patcher = mock.patch.object(log_tool, "LOG_FILE", self.log)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def main(self, *args):
+        """Run the CLI with args and return its stdout."""
+        stdout = io.StringIO()
+        with mock.patch.object(sys, "argv", ["log_tool.py", *args]), contextlib.redirect_stdout(stdout):
+            log_tool.main()
+        return stdout.getvalue()
+
+    def test_regular_log(self):
+        self.log.write_bytes(CASES["sample"])
+        out = self.dir / "sub" / "out.txt"
+        summary = self.main("--level", "info", "--out", str(out))
+        self.assertEqual(summary, f"Valid lines scanned: 2\nLines written: 1\nOutput file: {out}\n")
+        self.assertEqual(out.read_bytes(), b"2026-02-05 08:11:02 | INFO | auth | User login success\n")
+
+    def test_out_is_log(self):
+        self.log.write_bytes(CASES["sample"])
+        summary = self.main("--level", "info", "--out", str(self.log))
+        self.assertEqual(summary, f"Valid lines scanned: 2\nLines written: 1\nOutput file: {self.log}\n")
+        self.assertEqual(self.log.read_bytes(), b"2026-02-05 08:11:02 | INFO | auth | User login success\n")
+
+    def test_empty_log(self):
+        self.log.write_bytes(b"")
+        out = self.dir / "out.txt"
+        self.assertEqual(self.main("--out", str(out)), f"Valid lines scanned: 0\nLines written: 0\nOutput file: {out}\n")
+        self.assertEqual(out.read_bytes(), b"")
+
+    def test_missing_log(self):
+        out = self.dir / "out.txt"
+        self.assertEqual(self.main("--out", str(out)), f"Valid lines scanned: 0\nLines written: 0\nOutput file: {out}\n")
+        self.assertFalse(out.exists())
+
+    @unittest.skipUnless(hasattr(os, "mkfifo"), "needs os.mkfifo")
+    def test_fifo_log(self):
+        os.mkfifo(self.log)
+        writer = threading.Thread(target=self.log.write_bytes, args=(CASES["sample"],))
+        writer.start()
+        out = self.dir / "out.txt"
+        try:
+            summary = self.main("--service", "api", "--out", str(out))
+        finally:
+            writer.join()
+        self.assertEqual(summary, f"Valid lines scanned: 2\nLines written: 1\nOutput file: {out}\n")
+        self.assertEqual(out.read_bytes(), b"2026-02-05 08:11:25 | WARN | api | Slow response detected (920ms)\n")
+
+
+if __name__ == "__main__":
+    unittest.main()